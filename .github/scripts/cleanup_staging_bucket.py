@@ -1,62 +1,63 @@
-import os
-import boto3
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from r2_client import (
+    DELETE_BATCH_SIZE,
+    MAX_DELETE_WORKERS,
+    STAGING_BUCKET,
+    client,
+    delete_batch,
+)
 
 DELETION_THRESHOLD_DAYS = 7
-# Load config from environment
-ACCOUNT_ID = os.environ["R2_ACCOUNT_ID"]
-ACCESS_KEY_ID = os.environ["R2_ACCESS_KEY_ID"]
-SECRET_ACCESS_KEY = os.environ["R2_SECRET_ACCESS_KEY"]
-STAGING_BUCKET = os.environ["R2_STAGING_BUCKET"]
-ENDPOINT_URL = f"https://{ACCOUNT_ID}.r2.cloudflarestorage.com"
 
 print("--- Starting Staging Bucket Cleanup ---")
 print(f"Bucket: {STAGING_BUCKET}")
 print(f"Deletion Threshold: {DELETION_THRESHOLD_DAYS} days")
 
-client = boto3.client(
-    "s3",
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=ACCESS_KEY_ID,
-    aws_secret_access_key=SECRET_ACCESS_KEY,
-)
-
 paginator = client.get_paginator("list_objects_v2")
-pages = paginator.paginate(Bucket=STAGING_BUCKET)
+pages = paginator.paginate(Bucket=STAGING_BUCKET, PaginationConfig={"PageSize": 1000})
 
-objects_to_delete = []
 now = datetime.now(timezone.utc)
 threshold = now - timedelta(days=DELETION_THRESHOLD_DAYS)
 
-for page in pages:
-    if "Contents" not in page:
-        continue
-    for obj in page["Contents"]:
-        if obj["LastModified"] < threshold:
-            objects_to_delete.append({"Key": obj["Key"]})
-            print(
-                f"  - Marking for deletion: {obj['Key']} (last modified: {obj['LastModified']})"
-            )
-
-if not objects_to_delete:
+# Deletes are issued as soon as a full batch of expired keys is buffered, so
+# memory stays bounded and deletion overlaps with the remaining listing. Batches
+# run concurrently on a small thread pool (boto3 clients are thread-safe). The
+# age predicate stays in Python: botocore parses LastModified into datetimes,
+# which JMESPath's ordering comparators do not support.
+buffer: list[dict[str, str]] = []
+futures: list[Future[list[Any]]] = []
+deleted_count = 0
+with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as executor:
+    for page in pages:
+        buffer.extend(
+            {"Key": obj["Key"]}
+            for obj in page.get("Contents", ())
+            if obj["LastModified"] < threshold
+        )
+        while len(buffer) >= DELETE_BATCH_SIZE:
+            chunk, buffer = buffer[:DELETE_BATCH_SIZE], buffer[DELETE_BATCH_SIZE:]
+            futures.append(executor.submit(delete_batch, STAGING_BUCKET, chunk))
+            deleted_count += len(chunk)
+
+    if buffer:
+        futures.append(executor.submit(delete_batch, STAGING_BUCKET, buffer))
+        deleted_count += len(buffer)
+
+errors = [error for future in futures for error in future.result()]
+if errors:
+    print("  ❌ ERROR during batch deletion:")
+    for error in errors:
+        print(
+            f"    - Key: {error['Key']}, Code: {error['Code']}, Message: {error['Message']}"
+        )
+    exit(1)
+
+if not deleted_count:
     print("\nNo old objects found to delete. Exiting.")
     exit(0)
 
-print(f"\nFound {len(objects_to_delete)} objects to delete. Proceeding...")
-
-# Boto3 can delete up to 1000 objects in a single request
-for i in range(0, len(objects_to_delete), 1000):
-    chunk = objects_to_delete[i : i + 1000]
-    response = client.delete_objects(
-        Bucket=STAGING_BUCKET, Delete={"Objects": chunk, "Quiet": True}
-    )
-    if "Errors" in response and response["Errors"]:
-        print("  ❌ ERROR during batch deletion:")
-        for error in response["Errors"]:
-            print(
-                f"    - Key: {error['Key']}, Code: {error['Code']}, Message: {error['Message']}"
-            )
-        exit(1)
-
-print(f"✅ Successfully deleted {len(objects_to_delete)} objects.")
+print(f"✅ Successfully deleted {deleted_count} objects.")
 print("--- Cleanup Complete ---")
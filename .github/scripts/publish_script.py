@@ -1,125 +1,156 @@
 import os
+import functools
 import json
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from operator import itemgetter, methodcaller
 
+from collections.abc import Callable
 from typing import Any
-import boto3
-from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+from r2_client import (
+    DELETE_BATCH_SIZE,
+    MAX_DELETE_WORKERS,
+    STAGING_BUCKET,
+    client,
+    delete_batch,
+)
+
+try:  # Optional C-accelerated JSON; the stdlib is used when it is not installed
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- Configuration ---
-ACCOUNT_ID = os.environ["R2_ACCOUNT_ID"]
-ACCESS_KEY_ID = os.environ["R2_ACCESS_KEY_ID"]
-SECRET_ACCESS_KEY = os.environ["R2_SECRET_ACCESS_KEY"]
 PROD_BUCKET = os.environ["R2_PRODUCTION_BUCKET"]
-STAGING_BUCKET = os.environ["R2_STAGING_BUCKET"]
-ENDPOINT_URL = f"https://{ACCOUNT_ID}.r2.cloudflarestorage.com"
 MANIFEST_FILE = "manifest.json"
 DATASETS_DOC_PATH = "docs/source/datasets.md"
 BASE_DOWNLOAD_URL = "https://data.openenergyoutlook.org/"
-
-# --- Boto3 S3 Client ---
-client = boto3.client(
-    "s3",
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=ACCESS_KEY_ID,
-    aws_secret_access_key=SECRET_ACCESS_KEY,
+DOCS_ROW_TEMPLATE = (
+    "| {fileName} | {version} | {timestamp} | {description} | {download} |\n"
 )
+# Staging -> production copies above 64 MiB use concurrent multipart copies
+COPY_CONFIG = TransferConfig(
+    multipart_threshold=64 * 1024 * 1024,
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=8,
+)
+
+
+def run_git(*args: str) -> subprocess.CompletedProcess[str]:
+    """Runs a git command, failing loudly (with git's stderr) if it errors."""
+    try:
+        return subprocess.run(
+            ["git", *args], check=True, capture_output=True, text=True
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"  ❌ ERROR: 'git {' '.join(args)}' failed:\n{e.stderr}")
+        raise
 
 
+@functools.cache
 def get_commit_details() -> dict[str, str]:
     """Gets the hash and subject of the latest commit affecting the manifest."""
-    commit_hash = (
-        subprocess.check_output(
-            ["git", "log", "-1", "--pretty=%h", "--", MANIFEST_FILE]
-        )
-        .decode()
-        .strip()
-    )
-    commit_subject = (
-        subprocess.check_output(
-            ["git", "log", "-1", "--pretty=%s", "--", MANIFEST_FILE]
-        )
-        .decode()
-        .strip()
-    )
-    return {"hash": commit_hash, "subject": commit_subject}
+    output = run_git(
+        "log", "-1", "--pretty=format:%h%x00%s", "--", MANIFEST_FILE
+    ).stdout
+    commit_hash, _, commit_subject = output.partition("\x00")
+    return {"hash": commit_hash.strip(), "subject": commit_subject.strip()}
 
 
 def finalize_dataset_docs(manifest_data: list[dict[str, Any]]) -> None:
     """
     Reads updated manifest and generates a Markdown table of datasets and their
-    versions including download lionks, and writes it to docs
+    versions including download lionks, and writes it to docs. Committing the
+    result is left to finalize_manifest.
     """
 
-    markdown_content = "# Available Datasets\n\n"
-    markdown_content += (
+    parts = [
+        "# Available Datasets\n\n",
         "This page lists all versioned datasets managed by the OEO Data Management tool,"
-        "\n\n"
-    )
-
-    markdown_content += (
+        "\n\n",
         "| Dataset Name | Version | Timestamp (UTC) | Description | Download |\n"
-        "|--------------|---------|-----------------|-------------|----------|\n"
-    )
+        "|--------------|---------|-----------------|-------------|----------|\n",
+    ]
 
-    manifest_data.sort(key=lambda x: x["fileName"])
+    manifest_data.sort(key=itemgetter("fileName"))
 
     for dataset in manifest_data:
         file_name = dataset["fileName"]
+        # methodcaller keeps the sort key in C without filling in missing
+        # timestamps on the manifest entries themselves.
         history_sorted = sorted(
-            dataset.get("history", []),
-            key=lambda x: x.get("timestamp", ""),
+            dataset.get("history") or [],
+            key=methodcaller("get", "timestamp", ""),
             reverse=True,
         )
         for version_entry in history_sorted:
-            version = version_entry.get("version", "N/A")
-            # Remove 'Z' from timestamp for cleaner display in docs
-            timestamp = version_entry.get("timestamp", "N/A").replace("Z", "")
-            # Ensure description is single-line for table markdown
-            description = version_entry.get("description", "").replace("\n", " ")
             r2_object_key = version_entry.get("r2_object_key")
-
-            download_link = "N/A"
-            if r2_object_key:
-                # Construct the full download URL
-                full_url = f"{BASE_DOWNLOAD_URL}{r2_object_key}"
-                download_link = f"[Download]({full_url})"
-
-            markdown_content += (
-                f"| {file_name} "
-                f"| {version} "
-                f"| {timestamp} "
-                f"| {description} "
-                f"| {download_link} |\n"
-            )
+            row = {
+                "fileName": file_name,
+                "version": version_entry.get("version", "N/A"),
+                # Remove 'Z' from timestamp for cleaner display in docs
+                "timestamp": (version_entry.get("timestamp") or "N/A").replace("Z", ""),
+                # Ensure description is single-line for table markdown
+                "description": version_entry.get("description", "").replace("\n", " "),
+                "download": (
+                    f"[Download]({BASE_DOWNLOAD_URL}{r2_object_key})"
+                    if r2_object_key
+                    else "N/A"
+                ),
+            }
+            parts.append(DOCS_ROW_TEMPLATE.format_map(row))
 
     with open(DATASETS_DOC_PATH, "w") as f:
-        f.write(markdown_content)
+        f.write("".join(parts))
 
-    subprocess.run(["git", "add", DATASETS_DOC_PATH])
-    subprocess.run(
-        ["git", "commit", "-m", "Updating dataset docs to reflect manifest file"]
-    )
 
+def finalize_manifest(
+    updated_data: list[dict[str, Any]],
+    commit_message: str,
+    before_push: Callable[[], None] | None = None,
+) -> None:
+    """
+    Writes the updated manifest, commits, and pushes the changes.
 
-def finalize_manifest(updated_data: list[dict[str, Any]], commit_message: str) -> None:
-    """Writes the updated manifest, commits, and pushes the changes."""
+    `before_push`, if given, is called after the commit and before the push.
+    """
     print("\nFinalizing manifest file...")
-    with open(MANIFEST_FILE, "w") as f:
-        json.dump(updated_data, f, indent=2, ensure_ascii=False)
-        f.write("\n")
+    if orjson is not None:
+        payload = orjson.dumps(
+            updated_data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        )
+    else:
+        text = json.dumps(updated_data, indent=2, ensure_ascii=False) + "\n"
+        payload = text.encode()
 
-    print("Committing and pushing finalized manifest...")
-    subprocess.run(["git", "config", "user.name", "github-actions[bot]"])
-    subprocess.run(
-        ["git", "config", "user.email", "github-actions[bot]@users.noreply.github.com"]
-    )
-    subprocess.run(["git", "add", MANIFEST_FILE])
-    subprocess.run(["git", "commit", "-m", commit_message])
+    with open(MANIFEST_FILE, "rb") as f:
+        if f.read() == payload:
+            print("No manifest changes; skipping commit and push.")
+            return
+    with open(MANIFEST_FILE, "wb") as f:
+        f.write(payload)
 
     finalize_dataset_docs(updated_data)
 
-    subprocess.run(["git", "push"])
+    # Manifest and docs go out in a single commit; the bot identity is passed
+    # per-invocation rather than written to the repo config.
+    print("Committing and pushing finalized manifest...")
+    run_git("add", MANIFEST_FILE, DATASETS_DOC_PATH)
+    run_git(
+        "-c",
+        "user.name=github-actions[bot]",
+        "-c",
+        "user.email=github-actions[bot]@users.noreply.github.com",
+        "commit",
+        "-m",
+        commit_message,
+    )
+    if before_push is not None:
+        before_push()
+    run_git("push")
     print("✅ Manifest finalized.")
 
 
@@ -129,51 +160,66 @@ def handle_deletions(manifest_data: list[dict[str, Any]]) -> bool:
     Returns True if any deletions were processed.
     """
     print("--- Phase 1: Checking for pending deletions ---")
-    datasets_to_keep = []
-    objects_to_delete_from_r2 = []
-    processed_deletion = False
-
-    for dataset in manifest_data:
-        if dataset.get("status") == "pending-deletion":
-            processed_deletion = True
-            print(f"Found dataset marked for full deletion: {dataset['fileName']}")
-            for entry in dataset.get("history", []):
-                if "r2_object_key" in entry:
-                    objects_to_delete_from_r2.append({"Key": entry["r2_object_key"]})
-        else:
-            versions_to_keep = []
-            for entry in dataset.get("history", []):
-                if entry.get("status") == "pending-deletion":
-                    processed_deletion = True
-                    print(
-                        f"Found version marked for deletion: {dataset['fileName']} v{entry['version']}"
-                    )
-                    if "r2_object_key" in entry:
-                        objects_to_delete_from_r2.append(
-                            {"Key": entry["r2_object_key"]}
-                        )
-                else:
-                    versions_to_keep.append(entry)
-            dataset["history"] = versions_to_keep
-            datasets_to_keep.append(dataset)
-
-    if not processed_deletion:
+    # Cheap read-only pass first, so the common no-op run allocates nothing.
+    if not any(
+        dataset.get("status") == "pending-deletion"
+        or any(
+            entry.get("status") == "pending-deletion"
+            for entry in dataset.get("history") or ()
+        )
+        for dataset in manifest_data
+    ):
         print("No pending deletions found.")
         return False
 
-    if objects_to_delete_from_r2:
-        print(
-            f"\nDeleting {len(objects_to_delete_from_r2)} objects from production R2 bucket..."
-        )
-        for i in range(0, len(objects_to_delete_from_r2), 1000):
-            chunk: Any = objects_to_delete_from_r2[i : i + 1000]
-            response = client.delete_objects(
-                Bucket=PROD_BUCKET, Delete={"Objects": chunk, "Quiet": True}
-            )
-            if response.get("Errors"):
-                print("  ❌ ERROR during batch deletion:", response["Errors"])
-                exit(1)
-        print("✅ Successfully deleted objects from R2.")
+    datasets_to_keep = []
+    # Keys are deleted from R2 as soon as a full batch is buffered rather than
+    # after the whole manifest has been scanned, with batches running
+    # concurrently on a small thread pool.
+    buffer: list[dict[str, str]] = []
+    futures: list[Future[list[Any]]] = []
+    deleted_count = 0
+
+    with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as executor:
+
+        def queue_for_deletion(key: str) -> None:
+            nonlocal buffer, deleted_count
+            buffer.append({"Key": key})
+            if len(buffer) >= DELETE_BATCH_SIZE:
+                futures.append(executor.submit(delete_batch, PROD_BUCKET, buffer))
+                deleted_count += len(buffer)
+                buffer = []
+
+        for dataset in manifest_data:
+            if dataset.get("status") == "pending-deletion":
+                print(f"Found dataset marked for full deletion: {dataset['fileName']}")
+                for entry in dataset.get("history") or ():
+                    if "r2_object_key" in entry:
+                        queue_for_deletion(entry["r2_object_key"])
+            else:
+                versions_to_keep = []
+                for entry in dataset.get("history") or ():
+                    if entry.get("status") == "pending-deletion":
+                        print(
+                            f"Found version marked for deletion: {dataset['fileName']} v{entry['version']}"
+                        )
+                        if "r2_object_key" in entry:
+                            queue_for_deletion(entry["r2_object_key"])
+                    else:
+                        versions_to_keep.append(entry)
+                dataset["history"] = versions_to_keep
+                datasets_to_keep.append(dataset)
+
+        if buffer:
+            futures.append(executor.submit(delete_batch, PROD_BUCKET, buffer))
+            deleted_count += len(buffer)
+
+    errors = [error for future in futures for error in future.result()]
+    if errors:
+        print("  ❌ ERROR during batch deletion:", errors)
+        exit(1)
+    if deleted_count:
+        print(f"✅ Successfully deleted {deleted_count} objects from R2.")
 
     finalize_manifest(datasets_to_keep, "ci: Finalize manifest after data deletion")
     return True
@@ -185,56 +231,97 @@ def handle_publications(manifest_data: list[dict[str, Any]]) -> bool:
     Returns True if a publication was processed.
     """
     print("\n--- Phase 2: Checking for pending publications ---")
-    for dataset in manifest_data:
-        for i, entry in enumerate(dataset["history"]):
-            if entry.get("commit") == "pending-merge":
-                commit_details = get_commit_details()
-                entry["commit"] = commit_details["hash"]
-                # Only overwrite description if it's the placeholder
-                if entry.get("description") == "pending-merge":
-                    entry["description"] = commit_details["subject"]
-
-                if "staging_key" in entry and entry["staging_key"]:
-                    staging_key = entry.pop("staging_key")
-                    final_key = entry["r2_object_key"]
-                    print(f"Publishing: {dataset['fileName']} v{entry['version']}")
-                    print(f"  Description: {entry['description']}")
-                    try:
-                        copy_source: Any = {
-                            "Bucket": STAGING_BUCKET,
-                            "Key": staging_key,
-                        }
-                        client.copy_object(
-                            CopySource=copy_source, Bucket=PROD_BUCKET, Key=final_key
-                        )
-                        print("  ✅ Server-side copy successful.")
-                        client.delete_object(Bucket=STAGING_BUCKET, Key=staging_key)
-                        print("  ✅ Staging object deleted.")
-                    except ClientError as e:
-                        print(f"  ❌ ERROR: Could not process object. Reason: {e}")
-                        exit(1)
-                else:
-                    print(
-                        f"Finalizing rollback: {dataset['fileName']} v{entry['version']}"
-                    )
-                    print(f"  Description: {entry['description']}")
-
-                dataset["history"][i] = entry
-                finalize_manifest(
-                    manifest_data,
-                    f"ci: Publish {dataset['fileName']} {entry['version']}",
-                )
-                return True  # Process only one publication per run
-
-    print("No pending publications found.")
-    return False
+    # Only one publication is processed per run, so stop at the first match.
+    pending = next(
+        (
+            (dataset, i, entry)
+            for dataset in manifest_data
+            for i, entry in enumerate(dataset.get("history") or ())
+            if entry.get("commit") == "pending-merge"
+        ),
+        None,
+    )
+    if pending is None:
+        print("No pending publications found.")
+        return False
+
+    dataset, i, entry = pending
+    commit_details = get_commit_details()
+    entry["commit"] = commit_details["hash"]
+    # Only overwrite description if it's the placeholder
+    if entry.get("description") == "pending-merge":
+        entry["description"] = commit_details["subject"]
+
+    staging_delete: Future[Any] | None = None
+    if "staging_key" in entry and entry["staging_key"]:
+        staging_key = entry.pop("staging_key")
+        final_key = entry["r2_object_key"]
+        print(f"Publishing: {dataset['fileName']} v{entry['version']}")
+        print(f"  Description: {entry['description']}")
+        try:
+            copy_source: Any = {
+                "Bucket": STAGING_BUCKET,
+                "Key": staging_key,
+            }
+            # Managed copy: switches to a concurrent multipart copy for large
+            # staged artifacts.
+            client.copy(copy_source, PROD_BUCKET, final_key, Config=COPY_CONFIG)
+            print("  ✅ Server-side copy successful.")
+        except ClientError as e:
+            print(f"  ❌ ERROR: Could not process object. Reason: {e}")
+            exit(1)
+        # The staging delete doesn't affect the manifest, so let it run while
+        # the manifest is finalized; wait_for_staging_delete() always joins it.
+        executor = ThreadPoolExecutor(max_workers=1)
+        staging_delete = executor.submit(
+            client.delete_object, Bucket=STAGING_BUCKET, Key=staging_key
+        )
+        executor.shutdown(wait=False)
+    else:
+        print(f"Finalizing rollback: {dataset['fileName']} v{entry['version']}")
+        print(f"  Description: {entry['description']}")
+
+    def wait_for_staging_delete() -> None:
+        nonlocal staging_delete
+        if staging_delete is None:
+            return
+        future, staging_delete = staging_delete, None
+        try:
+            future.result()
+            print("  ✅ Staging object deleted.")
+        except (BotoCoreError, ClientError) as e:
+            # The data is already live; the weekly staging cleanup will remove
+            # the leftover object.
+            print(
+                "  ⚠️ WARNING: Could not delete staging object "
+                f"{STAGING_BUCKET}/{staging_key}: {e}"
+            )
+
+    dataset["history"][i] = entry
+    try:
+        # Settle the delete before pushing, so its outcome is logged with
+        # the run that published the data.
+        finalize_manifest(
+            manifest_data,
+            f"ci: Publish {dataset['fileName']} {entry['version']}",
+            before_push=wait_for_staging_delete,
+        )
+    finally:
+        # Also reached when finalizing fails or there is nothing to push.
+        wait_for_staging_delete()
+    return True
 
 
 def main() -> None:
     """Main execution block."""
     print("Starting dataset publish/cleanup process...")
-    with open(MANIFEST_FILE) as f:
-        manifest_data = json.load(f)
+    # Read the manifest once as raw bytes; both parsers accept bytes directly,
+    # which skips the text-mode decode pass.
+    with open(MANIFEST_FILE, "rb") as f:
+        raw_manifest = f.read()
+    manifest_data = (
+        orjson.loads(raw_manifest) if orjson is not None else json.loads(raw_manifest)
+    )
 
     # Prioritize deletions. If any are found, the script will exit after handling them.
     deletions_processed = handle_deletions(manifest_data)
@@ -0,0 +1,65 @@
+"""Shared R2 client setup for the CI scripts in this directory."""
+
+import os
+import random
+import time
+from typing import Any
+
+import boto3
+from botocore.config import Config
+
+# --- Configuration ---
+ACCOUNT_ID = os.environ["R2_ACCOUNT_ID"]
+ACCESS_KEY_ID = os.environ["R2_ACCESS_KEY_ID"]
+SECRET_ACCESS_KEY = os.environ["R2_SECRET_ACCESS_KEY"]
+STAGING_BUCKET = os.environ["R2_STAGING_BUCKET"]
+ENDPOINT_URL = f"https://{ACCOUNT_ID}.r2.cloudflarestorage.com"
+DELETE_BATCH_SIZE = 1000  # Boto3 can delete up to 1000 objects in a single request
+# Cap on concurrent delete_objects requests, to stay within R2's request limits
+MAX_DELETE_WORKERS = 8
+# Per-key error codes from delete_objects that are worth retrying
+RETRYABLE_DELETE_CODES = {"SlowDown", "InternalError", "ServiceUnavailable"}
+MAX_DELETE_ATTEMPTS = 3
+
+# --- Boto3 S3 Client ---
+# Larger pool for the concurrent batch requests, and adaptive retries so
+# botocore backs off under R2 throttling.
+CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={"mode": "adaptive", "max_attempts": 10},
+    tcp_keepalive=True,
+)
+client = boto3.client(
+    "s3",
+    endpoint_url=ENDPOINT_URL,
+    aws_access_key_id=ACCESS_KEY_ID,
+    aws_secret_access_key=SECRET_ACCESS_KEY,
+    config=CLIENT_CONFIG,
+)
+
+
+def delete_batch(bucket: str, chunk: list[dict[str, str]]) -> list[Any]:
+    """
+    Deletes one batch of keys from a bucket, returning any errors.
+
+    Keys that fail with a transient error code are retried on their own, with
+    jittered backoff, so a throttled key doesn't fail the whole run.
+    """
+    objects: Any = chunk
+    attempt = 1
+    while True:
+        response = client.delete_objects(
+            Bucket=bucket, Delete={"Objects": objects, "Quiet": True}
+        )
+        errors = response.get("Errors") or []
+        retryable = [e for e in errors if e["Code"] in RETRYABLE_DELETE_CODES]
+        # Give up on success, on any non-transient failure, or when out of attempts
+        if (
+            not retryable
+            or len(retryable) < len(errors)
+            or attempt == MAX_DELETE_ATTEMPTS
+        ):
+            return errors
+        objects = [{"Key": e["Key"]} for e in retryable]
+        time.sleep(random.uniform(0.5, 1.5) * attempt)
+        attempt += 1
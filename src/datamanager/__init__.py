@@ -10,11 +10,19 @@ Typical usage
 
 from __future__ import annotations
 
+from importlib import import_module
 from importlib.metadata import version as _dist_version
+from types import ModuleType
 
-from . import core as core
 from . import manifest as manifest
 from .__main__ import app as app  # keeps `python -m datamanager` handy
 
 __all__ = ["app", "core", "manifest", "__version__"]
 __version__: str = _dist_version("datamanager")
+
+
+def __getattr__(name: str) -> ModuleType:
+    # `core` pulls in boto3, so it is only imported on first access.
+    if name == "core":
+        return import_module(".core", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,18 @@
 # datamanager/__main__.py
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timezone
 import tempfile
-from dateutil.parser import isoparse
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
-import questionary
 import typer
 from rich.console import Console
-from rich.table import Table
 
 from typing import Callable, Optional, Any
 
 from datamanager.config import settings
-from datamanager import core, manifest
+from datamanager import manifest
 
 
 # Common options for all commands
@@ -30,13 +29,26 @@ COMMON_OPTIONS = dict(
 def _ask_confirm(ctx: typer.Context, prompt: str, default: bool = False) -> bool:
     if ctx.obj.get("no_prompt"):
         return True
+    import questionary
+
     result: Optional[bool] = questionary.confirm(prompt, default=default).ask()
     return bool(result)  # Cast to bool to avoid NoneType issues
 
 
-def _rel(iso: str) -> str:
-    dt = isoparse(iso)
-    delta = datetime.now(timezone.utc) - dt
+def _utcnow_z() -> str:
+    """Returns the current UTC time as an ISO 8601 string with a 'Z' suffix."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _version_number(version: str) -> int:
+    """Returns the number in a 'vN' version label (e.g. 'v3' -> 3)."""
+    return int(version.removeprefix("v"))
+
+
+def _rel(iso: str, now: Optional[datetime] = None) -> str:
+    # fromisoformat accepts the trailing "Z" the manifest uses (Python 3.11+).
+    dt = datetime.fromisoformat(iso)
+    delta = (now or datetime.now(timezone.utc)) - dt
     hours = int(delta.total_seconds() // 3600)
     return f"{hours} h ago"
 
@@ -53,6 +65,10 @@ console = Console()
 @app.command()
 def verify(ctx: typer.Context) -> None:
     """Verifies Cloudflare R2 credentials and granular bucket permissions."""
+    from rich.table import Table
+
+    from datamanager import core
+
     console.print("🔍 Verifying Cloudflare R2 configuration...")
 
     results = core.verify_r2_access()
@@ -96,15 +112,19 @@ def verify(ctx: typer.Context) -> None:
 @app.command()
 def list_datasets(ctx: typer.Context) -> None:
     """Lists all datasets tracked in the manifest."""
+    from rich.table import Table
+
     data = manifest.read_manifest()
     table = Table("Dataset Name", "Latest Version", "Last Updated", "SHA256")
+    now = datetime.now(timezone.utc)
+    add_row = table.add_row
     for item in data:
         latest = item["history"][0]
-        table.add_row(
+        timestamp = latest["timestamp"]
+        add_row(
             item["fileName"],
             latest["version"],
-            # latest["timestamp"],
-            f"{_rel(latest['timestamp'])} ({latest['timestamp']})",
+            f"{_rel(timestamp, now)} ({timestamp})",
             f"{latest['sha256'][:12]}...",
         )
     console.print(table)
@@ -112,6 +132,8 @@ def list_datasets(ctx: typer.Context) -> None:
 
 def _run_pull_logic(name: str, version: str, output: Optional[Path]) -> None:
     """The core logic for pulling and verifying a dataset."""
+    from datamanager import core
+
     console.print(f"🔎 Locating version '{version}' for dataset '{name}'...")
     version_entry = manifest.get_version_entry(name, version)
 
@@ -169,6 +191,8 @@ def pull(
 
 def _pull_interactive(ctx: typer.Context) -> None:
     """Guides the user through pulling a specific dataset version interactively."""
+    import questionary
+
     console.print("\n[bold]Interactive Dataset Pull[/]")
 
     all_datasets: list[dict[str, Any]] = manifest.read_manifest()
@@ -190,20 +214,24 @@ def _pull_interactive(ctx: typer.Context) -> None:
         console.print(f"[red]Error: No version history found for {selected_name}.[/]")
         return
 
+    now = datetime.now(timezone.utc)
+    # The title is for display only; the answer is the bare version string.
     version_choices = [
-        f"{entry['version']} (commit: {entry['commit']}, {_rel(entry['timestamp'])})"
+        questionary.Choice(
+            title=f"{entry['version']} (commit: {entry['commit']}, "
+            f"{_rel(entry['timestamp'], now)})",
+            value=entry["version"],
+        )
         for entry in dataset["history"]
     ]
-    selected_version_str = questionary.select(
+    version_to_pull = questionary.select(
         "Which version would you like to pull?", choices=version_choices
     ).ask()
 
-    if selected_version_str is None:
+    if version_to_pull is None:
         console.print("Pull cancelled.")
         return
 
-    version_to_pull = selected_version_str.split(" ")[0]
-
     output_path_str = questionary.path(
         "Enter the output path (or press Enter to save in current directory):",
         default=f"./{selected_name}",
@@ -225,101 +253,144 @@ def _pull_interactive(ctx: typer.Context) -> None:
 
 def _run_prepare_logic(ctx: typer.Context, name: str, file: Path) -> None:
     """The core logic for preparing a dataset for release."""
+    from rich.progress import Progress
+
+    from datamanager import core
+
     console.print(f"🚀 Preparing update for [cyan]{name}[/]...")
 
-    new_hash = core.hash_file(file)
     dataset = manifest.get_dataset(name)
     client = core.get_r2_client()  # Moved up to be available for diffing
-
-    # Check for changes BEFORE doing any uploads.
-    if dataset:
-        latest_version = dataset["history"][0]
-        if new_hash == latest_version["sha256"]:
+    file_size = file.stat().st_size
+
+    with ExitStack() as stack:
+        # An update downloads the previous version and uploads the new one
+        # side by side under one progress display. It is only opened once a
+        # transfer starts, so a no-change run draws nothing; its stack is
+        # entered first so the display outlives the executor's join on exit.
+        displays = stack.enter_context(ExitStack())
+        progress: Optional[Progress] = None
+        prefetch: Optional[Future[None]] = None
+        if dataset:
+            latest_version = dataset["history"][0]
+            old_path = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+            old_path /= "prev.sqlite"
+            # Entered after the temp dir so that, on exit, transfers are joined
+            # before the directory they write into is removed.
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=2))
+            # A size mismatch proves the file changed, so the previous version
+            # is certain to be needed for the diff.
+            size_changed = latest_version.get("size_bytes") not in (None, file_size)
+            if settings.prefetch_old or size_changed:
+                # Overlap the download with hashing the new file. If nothing
+                # changed, the download is wasted and waited on before exiting.
+                progress = displays.enter_context(Progress())
+                prefetch = executor.submit(
+                    core.download_from_r2,
+                    client,
+                    latest_version["r2_object_key"],
+                    old_path,
+                    progress,
+                )
+
+        new_hash = core.hash_file_cached(file)
+
+        # Check for changes BEFORE doing any uploads.
+        if dataset and not size_changed and new_hash == latest_version["sha256"]:
             console.print("✅ No changes detected. Manifest is already up to date.")
             return
 
-    # If we've reached this point, an upload is necessary.
-    staging_key = f"staging-uploads/{new_hash}.sqlite"
-    core.upload_to_staging(client, file, staging_key)
-
-    # Now, determine if this is a create or update to build the manifest entry
-    if dataset:
-        # --- This is an UPDATE ---
-        latest_version = dataset["history"][0]
-        prev_version_num = int(latest_version["version"].lstrip("v"))
-        new_version = f"v{prev_version_num + 1}"
-        r2_dir = Path(latest_version["r2_object_key"]).parent
-        final_r2_key = f"{r2_dir}/{new_version}-{new_hash}.sqlite"
-
-        console.print(f"Change detected! Preparing new version: {new_version}")
-
-        console.print("Downloading previous version to generate diff...")
-        diff_git_path: Optional[Path] = None
-        with tempfile.TemporaryDirectory() as tempdir:
-            old_path = Path(tempdir) / "prev.sqlite"
-            # Download from the PRODUCTION bucket
-            core.download_from_r2(client, latest_version["r2_object_key"], old_path)
-
-            full_diff, summary = core.generate_sql_diff(old_path, file)
-
-        if full_diff.count("\n") <= settings.max_diff_lines:
-            to_save = summary + full_diff
-            msg = "📝  Full diff stored in Git at:"
-        else:
-            to_save = summary
-            msg = "📝  Full diff too large; summary stored in Git at:"
-
-        diff_filename = f"diff-{latest_version['version']}-to-{new_version}.diff"
-        diff_git_path = Path("diffs") / name / diff_filename
-        diff_git_path.parent.mkdir(parents=True, exist_ok=True)
-        diff_git_path.write_text(to_save)
-        subprocess.run(["git", "add", str(diff_git_path)])
-
-        console.print(f"{msg} [green]{diff_git_path}[/]")
-
-        new_entry = {
-            "version": new_version,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-            "sha256": new_hash,
-            "r2_object_key": final_r2_key,
-            "staging_key": staging_key,
-            "diffFromPrevious": str(diff_git_path)
-            if diff_git_path
-            else None,  # Add path to entry
-            "commit": "pending-merge",
-            "description": "pending-merge",
-        }
-        manifest.add_history_entry(name, new_entry)
+        # If we've reached this point, an upload is necessary.
+        staging_key = f"staging-uploads/{new_hash}.sqlite"
+
+        # Now, determine if this is a create or update to build the manifest entry
+        if dataset:
+            # --- This is an UPDATE ---
+            prev_version_num = _version_number(latest_version["version"])
+            new_version = f"v{prev_version_num + 1}"
+            # R2 keys are always '/'-separated, whatever the local OS
+            r2_dir = PurePosixPath(latest_version["r2_object_key"]).parent
+            final_r2_key = f"{r2_dir}/{new_version}-{new_hash}.sqlite"
+
+            console.print(f"Change detected! Preparing new version: {new_version}")
+
+            console.print("Downloading previous version to generate diff...")
+            diff_filename = f"diff-{latest_version['version']}-to-{new_version}.diff"
+            diff_git_path = Path("diffs") / name / diff_filename
+            diff_git_path.parent.mkdir(parents=True, exist_ok=True)
+            if progress is None:
+                progress = displays.enter_context(Progress())
+            upload = executor.submit(
+                core.upload_to_staging, client, file, staging_key, progress
+            )
+            if prefetch is None:
+                # Download from the PRODUCTION bucket
+                core.download_from_r2(
+                    client, latest_version["r2_object_key"], old_path, progress
+                )
+            else:
+                prefetch.result()
+
+            # Streamed straight to disk; only the summary is kept when the
+            # full diff exceeds the line limit.
+            full_diff_stored = core.write_sql_diff(
+                old_path, file, diff_git_path, settings.max_diff_lines
+            )
+            upload.result()
+
+            if full_diff_stored:
+                msg = "📝  Full diff stored in Git at:"
+            else:
+                msg = "📝  Full diff too large; summary stored in Git at:"
+
+            subprocess.run(["git", "add", "--", str(diff_git_path)])
+
+            console.print(f"{msg} [green]{diff_git_path}[/]")
+
+            new_entry = {
+                "version": new_version,
+                "timestamp": _utcnow_z(),
+                "sha256": new_hash,
+                "size_bytes": file_size,
+                "r2_object_key": final_r2_key,
+                "staging_key": staging_key,
+                "diffFromPrevious": str(diff_git_path)
+                if diff_git_path
+                else None,  # Add path to entry
+                "commit": "pending-merge",
+                "description": "pending-merge",
+            }
+            manifest.add_history_entry(name, new_entry)
 
-    else:
-        # --- This is for CREATE ---
-        new_dataset_obj = {
-            "fileName": name,
-            "latestVersion": "v1",
-            "history": [
-                {
-                    "version": "v1",
-                    "timestamp": datetime.now(timezone.utc)
-                    .isoformat()
-                    .replace("+00:00", "Z"),
-                    "sha256": new_hash,
-                    "r2_object_key": f"{Path(Path(name).stem)}/v1-{new_hash}.sqlite",
-                    "staging_key": staging_key,
-                    "diffFromPrevious": None,  # Explicitly None for new datasets
-                    "commit": "pending-merge",
-                    "description": "pending-merge",
-                }
-            ],
-        }
-        manifest.add_new_dataset(new_dataset_obj)
+        else:
+            # --- This is for CREATE ---
+            core.upload_to_staging(client, file, staging_key)
+            new_dataset_obj = {
+                "fileName": name,
+                "latestVersion": "v1",
+                "history": [
+                    {
+                        "version": "v1",
+                        "timestamp": _utcnow_z(),
+                        "sha256": new_hash,
+                        "size_bytes": file_size,
+                        "r2_object_key": f"{Path(name).stem}/v1-{new_hash}.sqlite",
+                        "staging_key": staging_key,
+                        "diffFromPrevious": None,  # Explicitly None for new datasets
+                        "commit": "pending-merge",
+                        "description": "pending-merge",
+                    }
+                ],
+            }
+            manifest.add_new_dataset(new_dataset_obj)
 
     console.print(
         f"\n[bold green]✅ Preparation complete![/] Manifest file '{settings.manifest_file}' has been updated."
     )
     console.print(
         "\nNext steps:\n"
-        "  1. [cyan]git add .[/]\n"
-        '  2. [cyan]git commit -m "feat: Prepare update for {name}"[/]\n'
+        f"  1. [cyan]git add {settings.manifest_file}[/]\n"
+        f'  2. [cyan]git commit -m "feat: Prepare update for {name}"[/]\n'
         "  3. [cyan]git push[/]\n"
         "  4. Open a Pull Request to merge your changes into the main branch."
     )
@@ -342,6 +413,8 @@ def prepare(
 
 def _prepare_interactive(ctx: typer.Context) -> None:
     """Guides the user through preparing a dataset for release."""
+    import questionary
+
     console.print("\n[bold]Interactive Dataset Preparation[/]")
 
     selected_file_str = questionary.path(
@@ -401,7 +474,7 @@ def _run_rollback_logic(ctx: typer.Context, name: str, to_version: str) -> None:
         )
         return
 
-    new_version_num = int(latest_version["version"].lstrip("v")) + 1
+    new_version_num = _version_number(latest_version["version"]) + 1
     new_version = f"v{new_version_num}"
 
     console.print(
@@ -414,13 +487,16 @@ def _run_rollback_logic(ctx: typer.Context, name: str, to_version: str) -> None:
 
     rollback_entry = {
         "version": new_version,
-        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "timestamp": _utcnow_z(),
         "sha256": target_entry["sha256"],
         "r2_object_key": target_entry["r2_object_key"],
         "diffFromPrevious": None,
         "commit": "pending-merge",
         "description": f"Rollback to version {target_entry['version']}",
     }
+    # Older entries predate size tracking; don't write a null size for them.
+    if "size_bytes" in target_entry:
+        rollback_entry["size_bytes"] = target_entry["size_bytes"]
 
     manifest.add_history_entry(name, rollback_entry)
     manifest.update_latest_version(name, new_version)
@@ -457,6 +533,8 @@ def rollback(
 
 def _rollback_interactive(ctx: typer.Context) -> None:
     """Guides the user through rolling back a dataset interactively."""
+    import questionary
+
     console.print("\n[bold]Interactive Dataset Rollback[/]")
 
     all_datasets: list[dict[str, Any]] = manifest.read_manifest()
@@ -481,20 +559,24 @@ def _rollback_interactive(ctx: typer.Context) -> None:
         return
 
     # Exclude the latest version from the choices, as you can't roll back to it.
+    now = datetime.now(timezone.utc)
+    # The title is for display only; the answer is the bare version string.
     version_choices = [
-        f"{entry['version']} (commit: {entry['commit']}, {_rel(entry['timestamp'])})"
+        questionary.Choice(
+            title=f"{entry['version']} (commit: {entry['commit']}, "
+            f"{_rel(entry['timestamp'], now)})",
+            value=entry["version"],
+        )
         for entry in dataset["history"][1:]  # Start from the second entry
     ]
-    selected_version_str = questionary.select(
+    version_to_restore = questionary.select(
         "Which version do you want to restore?", choices=version_choices
     ).ask()
 
-    if selected_version_str is None:
+    if version_to_restore is None:
         console.print("Rollback cancelled.")
         return
 
-    version_to_restore = selected_version_str.split(" ")[0]
-
     try:
         _run_rollback_logic(ctx, name=selected_name, to_version=version_to_restore)
     except typer.Exit:
@@ -503,6 +585,8 @@ def _rollback_interactive(ctx: typer.Context) -> None:
 
 def _run_delete_logic(ctx: typer.Context, name: str) -> None:
     """The core logic for marking a dataset for deletion."""
+    import questionary
+
     console.print(f"🗑️  Preparing deletion for [bold red]{name}[/].")
 
     if not manifest.get_dataset(name):
@@ -609,6 +693,8 @@ def prune_versions(
 
 def _delete_interactive(ctx: typer.Context) -> None:
     """Guides the user through deleting a dataset interactively."""
+    import questionary
+
     console.print("\n[bold]Interactive Dataset Deletion[/]")
     all_datasets = manifest.read_manifest()
     if not all_datasets:
@@ -632,6 +718,8 @@ def _delete_interactive(ctx: typer.Context) -> None:
 
 def _prune_versions_interactive(ctx: typer.Context) -> None:
     """Guides the user through pruning old versions interactively."""
+    import questionary
+
     console.print("\n[bold]Interactive Version Pruning[/]")
     all_datasets = manifest.read_manifest()
     if not all_datasets:
@@ -693,6 +781,8 @@ def main(ctx: typer.Context, no_prompt: bool = COMMON_OPTIONS["no_prompt"]) -> N
         "Exit": "exit",
     }
 
+    import questionary
+
     choice = questionary.select(
         "What would you like to do?", choices=list(actions.keys())
     ).ask()
@@ -6,7 +6,8 @@ from pathlib import Path
 from dotenv import find_dotenv, dotenv_values
 import warnings
 
-_ENV_PATH = Path(find_dotenv()) if find_dotenv() else None
+_DOTENV = find_dotenv()  # walks up the directory tree, so only call it once
+_ENV_PATH = Path(_DOTENV) if _DOTENV else None
 _ENV = dotenv_values(_ENV_PATH) if _ENV_PATH else {}
 
 
@@ -21,6 +22,13 @@ def _need(var: str) -> str:
     return str(val)
 
 
+def _flag(var: str, default: bool = False) -> bool:
+    val = _ENV.get(var)
+    if val is None:
+        return default
+    return val.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass(frozen=True)
 class Settings:
     account_id: str = _need("R2_ACCOUNT_ID")
@@ -30,6 +38,9 @@ class Settings:
     staging_bucket: str = _need("R2_STAGING_BUCKET")
     manifest_file: str = "manifest.json"
     max_diff_lines: int = 500
+    # Start downloading the previous version while `prepare` hashes the new
+    # file. Faster for real updates, but a no-change run waits on the download.
+    prefetch_old: bool = _flag("DATAMANAGER_PREFETCH_OLD")
 
     @cached_property
     def endpoint_url(self) -> str:
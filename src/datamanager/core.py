@@ -1,29 +1,59 @@
 # datamanager/core.py
 import difflib
+import functools
 import hashlib
 import io
+import json
 import shutil
 import sqlite3
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
 from pathlib import Path, PurePath
 import os
+import time
 import uuid
 
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 import boto3
-from rich.progress import Progress
+from boto3.s3.transfer import TransferConfig
+from rich.progress import Progress, TaskID
 from rich.console import Console
 
 from types_boto3_s3.client import S3Client
 
-from typing import Any, TypedDict
+from typing import IO, Any, Iterator, Optional, TypedDict
 
 from datamanager.config import settings
 
 
 console = Console()
 
+# Keep-alive connections and adaptive retries so transfers back off under R2
+# throttling instead of failing.
+_CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={"mode": "adaptive", "max_attempts": 10},
+    tcp_keepalive=True,
+)
+
+# Objects above 16 MiB move as concurrent 16 MiB parts; eight streams fit
+# comfortably within the client's connection pool. Response bodies are read
+# and written to disk in 1 MiB blocks (default 256 KiB) to cut per-chunk
+# Python overhead on downloads.
+_MiB = 1024 * 1024
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * _MiB,
+    multipart_chunksize=16 * _MiB,
+    max_concurrency=8,
+    io_chunksize=_MiB,
+    use_threads=True,
+)
+
 
 class PermissionDict(TypedDict):
     read: bool
@@ -38,61 +68,180 @@ class VerificationResult(TypedDict):
     message: str
 
 
+@functools.lru_cache(maxsize=1)
 def get_r2_client() -> S3Client:
-    """Initializes and returns a boto3 S3 client for R2."""
+    """
+    Initializes and returns a boto3 S3 client for R2.
+
+    The client is built once per process and shared; boto3 clients are
+    thread-safe, so concurrent transfers can use it too.
+    """
     return boto3.client(
         "s3",
         endpoint_url=settings.endpoint_url,
         aws_access_key_id=settings.access_key,
         aws_secret_access_key=settings.secret_key,
         region_name="auto",
+        config=_CLIENT_CONFIG,
     )
 
 
 def hash_file(file_path: Path) -> str:
-    """Calculates and returns the SHA-256 hash of a file."""
-    h = hashlib.sha256()
+    """
+    Calculates and returns the SHA-256 hash of a file.
+
+    Uses hashlib.file_digest, which feeds the file to OpenSSL in large blocks
+    outside the interpreter loop (and so picks up SHA-NI where available).
+    """
     with open(file_path, "rb") as f:
-        while chunk := f.read(8192):
-            h.update(chunk)
-    return h.hexdigest()
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+# Files modified this recently are not cached: a later write within the same
+# timestamp tick would otherwise go unnoticed.
+_HASH_CACHE_MIN_AGE_NS = 2_000_000_000
+# Oldest entries are dropped beyond this many, so pulls can't grow it forever.
+_HASH_CACHE_MAX_ENTRIES = 256
+
+
+def _hash_cache_path() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "datamanager" / "hashes.json"
+
+
+def _save_hash_cache(cache_path: Path, cache: dict[str, Any]) -> None:
+    """Atomically replaces the hash cache, pruning entries for missing files."""
+    live = [(k, v) for k, v in cache.items() if os.path.exists(k)]
+    pruned = dict(live[-_HASH_CACHE_MAX_ENTRIES:])
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp name, so concurrent processes don't write into one file.
+    tmp = tempfile.NamedTemporaryFile(
+        "w", dir=cache_path.parent, suffix=".tmp", delete=False
+    )
+    try:
+        with tmp:
+            tmp.write(json.dumps(pruned))
+        os.replace(tmp.name, cache_path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+
+
+def hash_file_cached(file_path: Path) -> str:
+    """
+    Returns the SHA-256 hash of a file, reusing an earlier result while the
+    file's inode, size, modification time and change time are unchanged.
+
+    Results live in a small per-user cache keyed by absolute path, so running
+    `prepare` again on an untouched multi-GB file skips reading it. The change
+    time is part of the key because, unlike the modification time, tools such
+    as `touch -r` or `rsync -t` cannot restore it after rewriting a file.
+    """
+    st = file_path.stat()
+    stamp = [st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns]
+    key = str(file_path.resolve())
+    cache_path = _hash_cache_path()
+    try:
+        cache = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cache = {}
+    if not isinstance(cache, dict):
+        cache = {}
+
+    entry = cache.get(key)
+    if isinstance(entry, dict) and entry.get("stamp") == stamp:
+        return str(entry["sha256"])
+
+    digest = hash_file(file_path)
+    changed_ns = max(st.st_mtime_ns, st.st_ctime_ns)
+    if time.time_ns() - changed_ns >= _HASH_CACHE_MIN_AGE_NS:
+        cache.pop(key, None)  # re-insert as the newest entry
+        cache[key] = {"stamp": stamp, "sha256": digest}
+        try:
+            _save_hash_cache(cache_path, cache)
+        except OSError:
+            pass  # The cache is an optimisation only
+    return digest
+
+
+class _ProgressCallback:
+    """
+    boto3 transfer callback that batches progress-bar updates.
+
+    boto3 calls it from its worker threads for every chunk moved; forwarding
+    at most every `interval` seconds keeps rich's locking and refresh work
+    off the transfer threads. Call flush() once the transfer returns.
+    """
+
+    def __init__(self, display: Progress, task: TaskID, interval: float = 0.05):
+        self._display = display
+        self._task = task
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last = 0.0
+
+    def __call__(self, bytes_transferred: int) -> None:
+        with self._lock:
+            self._pending += bytes_transferred
+            now = time.monotonic()
+            if now - self._last < self._interval:
+                return
+            advance, self._pending, self._last = self._pending, 0, now
+        self._display.update(self._task, advance=advance)
+
+    def flush(self) -> None:
+        with self._lock:
+            advance, self._pending = self._pending, 0
+        if advance:
+            self._display.update(self._task, advance=advance)
+
+
+def _progress_display(progress: Optional[Progress]) -> AbstractContextManager[Progress]:
+    """Reuses a caller's shared progress display, or opens a fresh one."""
+    return nullcontext(progress) if progress is not None else Progress()
 
 
 def upload_to_r2(client: S3Client, file_path: Path, object_key: str) -> None:
     """Uploads a file to R2 with a progress bar."""
     file_size = file_path.stat().st_size
-    with Progress() as progress:
-        task = progress.add_task(
-            f"[cyan]Uploading {file_path.name}...", total=file_size
-        )
+    with Progress() as display:
+        task = display.add_task(f"[cyan]Uploading {file_path.name}...", total=file_size)
+        callback = _ProgressCallback(display, task)
         client.upload_file(
             str(file_path),
             settings.bucket,
             object_key,
-            Callback=lambda bytes_transferred: progress.update(
-                task, advance=bytes_transferred
-            ),
+            Callback=callback,
+            Config=_TRANSFER_CONFIG,
         )
+        callback.flush()
 
 
-def download_from_r2(client: S3Client, object_key: str, download_path: Path) -> None:
+def download_from_r2(
+    client: S3Client,
+    object_key: str,
+    download_path: Path,
+    progress: Optional[Progress] = None,
+) -> None:
     """Downloads a file from R2 with a progress bar."""
     try:
         file_size = client.head_object(Bucket=settings.bucket, Key=object_key)[
             "ContentLength"
         ]
-        with Progress() as progress:
-            task = progress.add_task(
+        with _progress_display(progress) as display:
+            task = display.add_task(
                 f"[cyan]Downloading {download_path.name}...", total=file_size
             )
+            callback = _ProgressCallback(display, task)
             client.download_file(
                 settings.bucket,
                 object_key,
                 str(download_path),
-                Callback=lambda bytes_transferred: progress.update(
-                    task, advance=bytes_transferred
-                ),
+                Callback=callback,
+                Config=_TRANSFER_CONFIG,
             )
+            callback.flush()
     except ClientError as e:
         # Handle cases where the object might not exist
         console.print(f"[bold red]Error downloading from R2: {e}[/]")
@@ -103,9 +252,16 @@ def pull_and_verify(object_key: str, expected_hash: str, output_path: Path) -> b
     """
     Downloads a file from R2, verifies its hash, and cleans up on failure.
 
+    A file already at `output_path` with the expected hash is kept as is,
+    so pulling the same version again costs no transfer.
+
     Returns:
         True if download and verification succeed, False otherwise.
     """
+    if output_path.is_file() and hash_file_cached(output_path) == expected_hash:
+        console.print("Local copy already matches the expected hash; skipping.")
+        return True
+
     client = get_r2_client()
     try:
         download_from_r2(client, object_key, output_path)
@@ -157,39 +313,115 @@ def generate_sql_diff(old_file: Path, new_file: Path) -> tuple[str, str]:
         return full_diff, summary
 
     # Pure-Python fallback: dump both DBs and diff
-    def _dump(db: Path) -> str:
-        buf = io.StringIO()
-        con = sqlite3.connect(db)
-        for line in con.iterdump():
-            buf.write(f"{line}\n")
-        con.close()
-        return buf.getvalue()
-
-    old_sql = _dump(old_file)
-    new_sql = _dump(new_file)
-
-    diff_iter = difflib.unified_diff(
-        old_sql.splitlines(keepends=True),
-        new_sql.splitlines(keepends=True),
+    buf = io.StringIO()
+    _, summary = _spool_python_sql_diff(old_file, new_file, buf)
+    return buf.getvalue(), summary
+
+
+def _dump_sqlite(db: Path) -> str:
+    """Returns the SQL text dump of a SQLite database."""
+    buf = io.StringIO()
+    con = sqlite3.connect(db)
+    for line in con.iterdump():
+        buf.write(f"{line}\n")
+    con.close()
+    return buf.getvalue()
+
+
+def _python_sql_diff(old_file: Path, new_file: Path) -> Iterator[str]:
+    """Lazily yields a unified diff of the SQL dumps of two SQLite files."""
+    return difflib.unified_diff(
+        _dump_sqlite(old_file).splitlines(keepends=True),
+        _dump_sqlite(new_file).splitlines(keepends=True),
         fromfile=str(PurePath(old_file).name),
         tofile=str(PurePath(new_file).name),
     )
-    full_diff = "".join(diff_iter)
 
-    # Synthesize a summary: count ADDs and DELs
-    adds = sum(
-        1
-        for ln in full_diff.splitlines()
-        if ln.startswith("+") and not ln.startswith("+++")
-    )
-    dels = sum(
-        1
-        for ln in full_diff.splitlines()
-        if ln.startswith("-") and not ln.startswith("---")
-    )
-    summary = f"# summary: {adds} additions, {dels} deletions\n"
 
-    return full_diff, summary
+def _spool_python_sql_diff(
+    old_file: Path, new_file: Path, sink: IO[str], max_lines: Optional[int] = None
+) -> tuple[bool, str]:
+    """
+    Writes the pure-Python diff into `sink` and synthesizes its summary.
+
+    Lines past `max_lines` are counted but not written; the whole diff has to
+    be walked anyway to count additions and deletions.
+
+    Returns:
+        (complete, summary), where `complete` is False if lines were dropped.
+    """
+    adds = dels = lines = 0
+    for ln in _python_sql_diff(old_file, new_file):
+        lines += 1
+        if max_lines is None or lines <= max_lines:
+            sink.write(ln)
+        if ln.startswith("+") and not ln.startswith("+++"):
+            adds += 1
+        elif ln.startswith("-") and not ln.startswith("---"):
+            dels += 1
+    complete = max_lines is None or lines <= max_lines
+    return complete, f"# summary: {adds} additions, {dels} deletions\n"
+
+
+def write_sql_diff(
+    old_file: Path, new_file: Path, out_path: Path, max_lines: int
+) -> bool:
+    """
+    Streams the diff between two SQLite files into `out_path`.
+
+    The file starts with the summary. The full diff follows only if it is at
+    most `max_lines` lines long; it is spooled through a temporary file rather
+    than held in memory, and with `sqldiff` generation stops as soon as the
+    limit is exceeded.
+
+    Returns:
+        True if the full diff was written, False if only the summary was.
+    """
+    # UTF-8 with no newline translation throughout, so the committed diff is
+    # byte-for-byte the same on every platform.
+    with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as body:
+        if shutil.which("sqldiff"):
+            complete = _spool_lines(
+                ["sqldiff", str(old_file), str(new_file)], body, max_lines
+            )
+            summary = subprocess.run(
+                ["sqldiff", "--summary", str(old_file), str(new_file)],
+                text=True,
+                capture_output=True,
+                check=True,
+            ).stdout
+        else:
+            complete, summary = _spool_python_sql_diff(
+                old_file, new_file, body, max_lines
+            )
+
+        with out_path.open("w", encoding="utf-8", newline="") as out:
+            out.write(summary)
+            if complete:
+                body.seek(0)
+                shutil.copyfileobj(body, out)
+    return complete
+
+
+def _spool_lines(cmd: list[str], sink: IO[str], max_lines: int) -> bool:
+    """
+    Copies a command's stdout into `sink` line by line.
+
+    Returns False (and kills the command) once more than `max_lines` lines
+    have been produced, True if the command finished within the limit.
+    """
+    with subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, encoding="utf-8", errors="replace"
+    ) as proc:
+        assert proc.stdout is not None
+        for lines, line in enumerate(proc.stdout, start=1):
+            if lines > max_lines:
+                proc.kill()
+                return False
+            sink.write(line)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return True
 
 
 def delete_from_r2(client: S3Client, object_key: str) -> None:
@@ -275,13 +507,18 @@ def verify_r2_access() -> list[VerificationResult]:
     Returns:
         A list of result dictionaries, one for each bucket check.
     """
-    results = []
+    results: list[VerificationResult] = []
     try:
         client = get_r2_client()
-        # Check Production Bucket
-        results.append(_check_bucket_permissions(client, settings.bucket))
-        # Check Staging Bucket
-        results.append(_check_bucket_permissions(client, settings.staging_bucket))
+        buckets = (settings.bucket, settings.staging_bucket)  # production, staging
+        # The probes are network-bound and independent, so check both buckets
+        # at once; map() keeps the results in bucket order.
+        with ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+            results.extend(
+                executor.map(
+                    functools.partial(_check_bucket_permissions, client), buckets
+                )
+            )
     except Exception as e:
         # Catches errors during client creation (e.g., bad endpoint)
         connection_error: VerificationResult = {
@@ -294,18 +531,39 @@ def verify_r2_access() -> list[VerificationResult]:
     return results
 
 
-def upload_to_staging(client: S3Client, file_path: Path, object_key: str) -> None:
-    """Uploads a file to the STAGING R2 bucket with a progress bar."""
+def upload_to_staging(
+    client: S3Client,
+    file_path: Path,
+    object_key: str,
+    progress: Optional[Progress] = None,
+) -> None:
+    """
+    Uploads a file to the STAGING R2 bucket with a progress bar.
+
+    Staging keys embed the file's SHA-256, so an object of the same size
+    already at `object_key` (e.g. from an earlier, abandoned prepare) holds
+    these exact bytes and the upload is skipped.
+
+    Pass a shared `progress` display to run alongside other transfers.
+    """
     file_size = file_path.stat().st_size
-    with Progress() as progress:
-        task = progress.add_task(
+    try:
+        head = client.head_object(Bucket=settings.staging_bucket, Key=object_key)
+        if head["ContentLength"] == file_size:
+            console.print(f"Already staged: [yellow]{object_key}[/]; skipping upload.")
+            return
+    except ClientError:
+        pass  # Not staged yet
+    with _progress_display(progress) as display:
+        task = display.add_task(
             f"[yellow]Uploading to staging: {file_path.name}...", total=file_size
         )
+        callback = _ProgressCallback(display, task)
         client.upload_file(
             str(file_path),
             settings.staging_bucket,
             object_key,
-            Callback=lambda bytes_transferred: progress.update(
-                task, advance=bytes_transferred
-            ),
+            Callback=callback,
+            Config=_TRANSFER_CONFIG,
         )
+        callback.flush()
@@ -4,9 +4,10 @@ Handles all read and write operations for the manifest.json file.
 This module ensures that the manifest is handled safely and consistently.
 """
 
+import functools
 import json
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from rich.console import Console
 
@@ -23,31 +24,90 @@ __all__ = [
     "update_dataset",
 ]
 
+try:  # Optional C-accelerated codec (the 'speedups' extra)
+    import orjson
+
+    _decode: Callable[[bytes], Any] = orjson.loads
+
+    def _encode(data: Any) -> bytes:
+        payload: bytes = orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        )
+        return payload
+
+except ImportError:
+    _decode = json.loads
+
+    def _encode(data: Any) -> bytes:
+        # Same bytes as orjson's output: 2-space indent, raw UTF-8, final newline
+        return (json.dumps(data, indent=2, ensure_ascii=False) + "\n").encode()
+
+
 # Initialize console for any feedback
 console = Console()
 MANIFEST_PATH = Path(settings.manifest_file)
 
 
+@functools.lru_cache(maxsize=1)
+def _load_cached(
+    path: Path, inode: int, mtime_ns: int, size: int
+) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+    """
+    Parses the manifest and indexes its datasets by 'fileName'.
+
+    Keyed on the file's identity and stat metadata, so any rewrite (including
+    the atomic swap in write_manifest, which changes the inode) misses the cache.
+    """
+    data = _parse(path)
+    index: dict[str, dict[str, Any]] = {}
+    for item in data:
+        name = item.get("fileName")
+        if isinstance(name, str):
+            index.setdefault(name, item)  # first match wins
+    return data, index
+
+
+def _parse(path: Path) -> list[dict[str, Any]]:
+    """Parses the manifest at `path`, reporting corruption before re-raising."""
+    try:
+        data: list[dict[str, Any]] = _decode(path.read_bytes())
+        return data
+    except json.JSONDecodeError:  # orjson's decode error subclasses this
+        console.print(
+            f"[bold red]Error:[/] Could not parse '{path}'. The file may be corrupted."
+        )
+        raise
+
+
+def _cached_manifest() -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+    """Returns the (datasets, index) pair for the current manifest file."""
+    try:
+        st = MANIFEST_PATH.stat()
+    except FileNotFoundError:
+        return [], {}
+    return _load_cached(MANIFEST_PATH.resolve(), st.st_ino, st.st_mtime_ns, st.st_size)
+
+
 def read_manifest() -> list[dict[str, Any]]:
     """
     Reads the manifest.json file from disk.
 
+    The parsed result is cached until the file changes, so repeated reads
+    within one CLI invocation are free. The returned list is shared: treat it
+    as read-only and use the functions below to modify the manifest.
+
     Returns:
         A list of dataset dictionaries. Returns an empty list if the
         manifest does not exist.
     """
+    return _cached_manifest()[0]
+
+
+def _read_for_update() -> list[dict[str, Any]]:
+    """Reads a private, freshly parsed copy of the manifest for modification."""
     if not MANIFEST_PATH.exists():
         return []
-    try:
-        with MANIFEST_PATH.open("r") as f:
-            data: list[dict[str, Any]] = json.load(f)
-            return data
-    except json.JSONDecodeError:
-        console.print(
-            f"[bold red]Error:[/] Could not parse '{MANIFEST_PATH}'. "
-            "The file may be corrupted."
-        )
-        raise
+    return _parse(MANIFEST_PATH)
 
 
 def write_manifest(data: list[dict[str, Any]]) -> None:
@@ -58,14 +118,14 @@ def write_manifest(data: list[dict[str, Any]]) -> None:
         data: The list of dataset dictionaries to write to the file.
     """
     tmp = MANIFEST_PATH.with_suffix(".json.tmp")
-    payload = json.dumps(data, indent=2) + "\n"  # ensure newline at end
-    tmp.write_text(payload, encoding="utf-8")
+    tmp.write_bytes(_encode(data))
     tmp.replace(MANIFEST_PATH)  # atomic swap
+    _load_cached.cache_clear()
 
 
 def update_latest_version(name: str, new_version: str) -> None:
     """Updates the top-level 'latestVersion' field for a dataset."""
-    data = read_manifest()
+    data = _read_for_update()
     for item in data:
         if item.get("fileName") == name:
             item["latestVersion"] = new_version
@@ -83,11 +143,7 @@ def get_dataset(name: str) -> Optional[dict[str, Any]]:
     Returns:
         The dataset dictionary if found, otherwise None.
     """
-    data = read_manifest()
-    for item in data:
-        if item.get("fileName") == name:
-            return item
-    return None
+    return _cached_manifest()[1].get(name)
 
 
 def add_history_entry(name: str, new_entry: dict[str, Any]) -> None:
@@ -102,7 +158,7 @@ def add_history_entry(name: str, new_entry: dict[str, Any]) -> None:
         name: The 'fileName' of the dataset to update.
         new_entry: The new history dictionary to prepend.
     """
-    data = read_manifest()
+    data = _read_for_update()
     dataset_found = False
     for item in data:
         if item.get("fileName") == name:
@@ -132,7 +188,7 @@ def update_latest_history_entry(name: str, final_entry: dict[str, Any]) -> None:
         final_entry: The final history dictionary that will replace the
                      current latest entry.
     """
-    data = read_manifest()
+    data = _read_for_update()
     dataset_found = False
     for item in data:
         if item.get("fileName") == name:
@@ -194,7 +250,7 @@ def add_new_dataset(dataset_object: dict[str, Any]) -> None:
     Args:
         dataset_object: The complete dictionary for the new dataset.
     """
-    data = read_manifest()
+    data = _read_for_update()
     data.append(dataset_object)
     write_manifest(data)
 
@@ -204,7 +260,7 @@ def update_dataset(name: str, updated_dataset: dict[str, Any]) -> None:
     Finds a dataset by name and replaces the entire object.
     Used for amending the commit hash after the initial commit.
     """
-    data = read_manifest()
+    data = _read_for_update()
     for i, item in enumerate(data):
         if item.get("fileName") == name:
             data[i] = updated_dataset
@@ -217,7 +273,7 @@ def mark_for_deletion(name: str) -> bool:
     Finds a dataset and adds a 'status: pending-deletion' flag.
     Returns True if the dataset was found and marked, False otherwise.
     """
-    data = read_manifest()
+    data = _read_for_update()
     dataset_found = False
     for item in data:
         if item.get("fileName") == name:
@@ -234,7 +290,7 @@ def mark_versions_for_deletion(name: str, versions_to_delete: list[str]) -> bool
     Finds a dataset and adds a 'status: pending-deletion' flag to specific
     history entries. Returns True on success.
     """
-    data = read_manifest()
+    data = _read_for_update()
     dataset_found = False
     for item in data:
         if item.get("fileName") == name:
@@ -12,6 +12,27 @@ import pytest
 from datamanager.core import hash_file
 
 
+@pytest.fixture(autouse=True)
+def isolated_hash_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keeps the per-user hash cache out of the real home directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def ci_scripts(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Makes the CI scripts in .github/scripts importable with dummy settings."""
+    for var in (
+        "R2_ACCOUNT_ID",
+        "R2_ACCESS_KEY_ID",
+        "R2_SECRET_ACCESS_KEY",
+        "R2_PRODUCTION_BUCKET",
+        "R2_STAGING_BUCKET",
+    ):
+        monkeypatch.setenv(var, "test")
+    scripts_dir = Path(__file__).resolve().parent.parent / ".github" / "scripts"
+    monkeypatch.syspath_prepend(str(scripts_dir))
+
+
 @pytest.fixture
 def test_repo(tmp_path: Path) -> Generator[Path, Any, None]:
     """
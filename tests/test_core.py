@@ -1,5 +1,12 @@
 # tests/test_core.py
+import json
+import os
+import shutil
+import signal
 import sqlite3
+import subprocess
+import sys
+import time
 from pathlib import Path
 from typing import Any
 from unittest.mock import MagicMock
@@ -7,6 +14,7 @@ from pytest_mock import MockerFixture
 import pytest
 
 from botocore.exceptions import ClientError
+from rich.progress import TaskID
 
 from datamanager import core
 from datamanager.config import settings
@@ -21,6 +29,75 @@ def test_hash_file(tmp_path: Path) -> None:
     assert core.hash_file(test_file) == expected_hash
 
 
+def test_hash_file_cached(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that an unchanged file is not re-hashed, but a modified one is."""
+    test_file = tmp_path / "test.txt"
+    test_file.write_text("hello world")
+    mocker.patch.object(core, "_HASH_CACHE_MIN_AGE_NS", 0)
+
+    first = core.hash_file_cached(test_file)
+    assert first == core.hash_file(test_file)
+
+    spy = mocker.spy(core, "hash_file")
+    assert core.hash_file_cached(test_file) == first
+    spy.assert_not_called()
+
+    test_file.write_text("hello there")
+    assert core.hash_file_cached(test_file) != first
+    spy.assert_called_once()
+
+
+def test_hash_file_cached_skips_recent_files(tmp_path: Path) -> None:
+    """Test that a file changed within the last tick is not cached."""
+    test_file = tmp_path / "test.txt"
+    test_file.write_text("hello world")
+
+    core.hash_file_cached(test_file)
+    assert not core._hash_cache_path().exists()
+
+
+def test_hash_file_cached_detects_restored_mtime(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Test that a same-size rewrite with its mtime put back is re-hashed."""
+    test_file = tmp_path / "test.txt"
+    test_file.write_text("hello world")
+    mocker.patch.object(core, "_HASH_CACHE_MIN_AGE_NS", 0)
+    first = core.hash_file_cached(test_file)
+    before = test_file.stat()
+
+    time.sleep(0.05)  # step past the filesystem's timestamp granularity
+    with open(test_file, "r+") as f:  # in place, so the inode is kept
+        f.write("hello there")
+    os.utime(test_file, ns=(before.st_atime_ns, before.st_mtime_ns))  # touch -r
+    after = test_file.stat()
+    assert (after.st_ino, after.st_size, after.st_mtime_ns) == (
+        before.st_ino,
+        before.st_size,
+        before.st_mtime_ns,
+    )
+
+    assert core.hash_file_cached(test_file) == core.hash_file(test_file) != first
+
+
+def test_hash_file_cached_prunes_entries(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that missing files are dropped and the cache size is capped."""
+    mocker.patch.object(core, "_HASH_CACHE_MIN_AGE_NS", 0)
+    mocker.patch.object(core, "_HASH_CACHE_MAX_ENTRIES", 2)
+    files = [tmp_path / f"{i}.txt" for i in range(4)]
+    for f in files:
+        f.write_text(f.name)
+
+    core.hash_file_cached(files[0])
+    files[0].unlink()
+    for f in files[1:]:
+        core.hash_file_cached(f)
+
+    cache = json.loads(core._hash_cache_path().read_text())
+    assert list(cache) == [str(f.resolve()) for f in files[2:]]
+    assert list(core._hash_cache_path().parent.iterdir()) == [core._hash_cache_path()]
+
+
 def test_generate_sql_diff(tmp_path: Path) -> None:
     """Test creating a diff between two sqlite files."""
     old_db_path = tmp_path / "old.sqlite"
@@ -57,6 +134,80 @@ def test_generate_sql_diff(tmp_path: Path) -> None:
     assert summary.strip(), "Summary should not be empty"
 
 
+def test_write_sql_diff(tmp_path: Path) -> None:
+    """Test that the diff is streamed to disk and truncated past the line limit."""
+    old_db_path = tmp_path / "old.sqlite"
+    new_db_path = tmp_path / "new.sqlite"
+
+    con = sqlite3.connect(old_db_path)
+    con.execute("CREATE TABLE users (id INT, name TEXT)")
+    con.execute("INSERT INTO users VALUES (1, 'Alice')")
+    con.commit()
+    con.close()
+
+    con = sqlite3.connect(new_db_path)
+    con.execute("CREATE TABLE users (id INT, name TEXT)")
+    con.execute("INSERT INTO users VALUES (2, 'Bob')")
+    con.commit()
+    con.close()
+
+    out_path = tmp_path / "out.diff"
+    full_diff, summary = core.generate_sql_diff(old_db_path, new_db_path)
+
+    # Within the limit: summary followed by the full diff
+    assert core.write_sql_diff(old_db_path, new_db_path, out_path, 500) is True
+    assert out_path.read_text() == summary + full_diff
+
+    # Over the limit: only the summary is kept
+    assert core.write_sql_diff(old_db_path, new_db_path, out_path, 1) is False
+    assert out_path.read_text() == summary
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs a POSIX shell stub")
+def test_write_sql_diff_with_sqldiff(
+    tmp_path: Path, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the sqldiff path: summary first, body cut off past the limit."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    stub = bin_dir / "sqldiff"
+    stub.write_text(
+        "#!/bin/sh\n"
+        'if [ "$1" = "--summary" ]; then echo "users: 0 changes"; exit 0; fi\n'
+        'seq 1 "$DIFF_LINES"\n'
+    )
+    stub.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    assert shutil.which("sqldiff") == str(stub)
+
+    procs: list[subprocess.Popen[str]] = []
+    real_popen = subprocess.Popen
+
+    def tracking_popen(*args: Any, **kwargs: Any) -> subprocess.Popen[str]:
+        proc = real_popen(*args, **kwargs)
+        procs.append(proc)
+        return proc
+
+    mocker.patch("subprocess.Popen", side_effect=tracking_popen)
+    old_db, new_db = tmp_path / "old.sqlite", tmp_path / "new.sqlite"
+    out_path = tmp_path / "out.diff"
+
+    # Within the limit: summary followed by the full body
+    monkeypatch.setenv("DIFF_LINES", "3")
+    assert core.write_sql_diff(old_db, new_db, out_path, 5) is True
+    assert out_path.read_text() == "users: 0 changes\n1\n2\n3\n"
+
+    # Over the limit: the diff process is killed and only the summary is kept
+    procs.clear()
+    monkeypatch.setenv("DIFF_LINES", "100000")
+    assert core.write_sql_diff(old_db, new_db, out_path, 5) is False
+    assert out_path.read_text() == "users: 0 changes\n"
+    assert procs[0].args == ["sqldiff", str(old_db), str(new_db)]
+    # Killed on overflow and reaped, rather than left running as a zombie
+    assert procs[0].returncode == -signal.SIGKILL
+    assert all(proc.poll() is not None for proc in procs)
+
+
 def test_r2_interactions(mocker: MockerFixture, tmp_path: Path) -> None:
     """Test that our code calls the boto3 client correctly."""
     mock_client = MagicMock()
@@ -153,6 +304,52 @@ def test_pull_and_verify_hash_mismatch(mocker: MockerFixture, tmp_path: Path) ->
     mock_remove.assert_called_once_with(output_file)
 
 
+def test_pull_and_verify_existing_file(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Test that an up-to-date local copy is not downloaded again."""
+    mock_download = mocker.patch("datamanager.core.download_from_r2")
+    output_file = tmp_path / "cached.sqlite"
+    output_file.write_text("already here")
+
+    success = core.pull_and_verify(
+        object_key="some/key",
+        expected_hash=core.hash_file(output_file),
+        output_path=output_file,
+    )
+
+    assert success is True
+    mock_download.assert_not_called()
+
+
+def test_upload_to_staging_skips_existing(tmp_path: Path) -> None:
+    """Test that a file already present in staging is not uploaded again."""
+    test_file = tmp_path / "staged.sqlite"
+    test_file.write_text("staged bytes")
+    mock_client = MagicMock()
+    mock_client.head_object.return_value = {"ContentLength": 12}
+
+    core.upload_to_staging(mock_client, test_file, "staging-uploads/abc.sqlite")
+
+    mock_client.head_object.assert_called_once_with(
+        Bucket=settings.staging_bucket, Key="staging-uploads/abc.sqlite"
+    )
+    mock_client.upload_file.assert_not_called()
+
+
+def test_progress_callback_batches_updates() -> None:
+    """Test that transfer callbacks are coalesced but no bytes are lost."""
+    display = MagicMock()
+    callback = core._ProgressCallback(display, task=TaskID(1), interval=60.0)
+
+    for _ in range(100):
+        callback(1024)
+    callback.flush()
+
+    # First call goes through immediately, the rest arrive in one flush
+    assert display.update.call_count == 2
+    advanced = sum(c.kwargs["advance"] for c in display.update.call_args_list)
+    assert advanced == 100 * 1024
+
+
 def test_download_from_r2_failure(mocker: MockerFixture, tmp_path: Path) -> None:
     """Test that download_from_r2 handles a ClientError gracefully."""
     mock_client = mocker.MagicMock()
@@ -1,4 +1,6 @@
+import json
 import os
+from dataclasses import replace
 from pathlib import Path
 
 from pytest_mock import MockerFixture
@@ -6,7 +8,7 @@ from typer.testing import CliRunner
 
 from datamanager import __main__ as main_app
 from datamanager.__main__ import app
-from datamanager import manifest
+from datamanager import core, manifest
 from datamanager.config import settings
 
 runner = CliRunner()
@@ -32,6 +34,7 @@ def test_prepare_for_create_success(test_repo: Path, mocker: MockerFixture) -> N
     assert dataset is not None
     assert dataset["history"][0]["diffFromPrevious"] is None
     assert dataset["history"][0]["description"] == "pending-merge"
+    assert dataset["history"][0]["size_bytes"] == new_file.stat().st_size
 
 
 def test_prepare_for_update_with_small_diff(
@@ -47,10 +50,14 @@ def test_prepare_for_update_with_small_diff(
     # Prepare a fake summary and full diff
     fake_summary = "# summary: 1 add, 1 del\n"
     fake_full = "--- a\n+++ b\n-foo\n+bar\n"
-    mocker.patch(
-        "datamanager.core.generate_sql_diff",
-        return_value=(fake_full, fake_summary),
-    )
+
+    def fake_write_sql_diff(
+        old: Path, new: Path, out_path: Path, max_lines: int
+    ) -> bool:
+        out_path.write_text(fake_summary + fake_full)
+        return True
+
+    mocker.patch("datamanager.core.write_sql_diff", side_effect=fake_write_sql_diff)
 
     v3_file = test_repo / "v3_data.sqlite"
     v3_file.write_text("this is v3")
@@ -80,13 +87,17 @@ def test_prepare_for_update_with_large_diff(
     mock_r2_client.head_object.return_value = {"ContentLength": 1024}
     mocker.patch("datamanager.core.upload_to_staging")
     mocker.patch("datamanager.core.download_from_r2")
-    # Make the full diff larger than the default limit, but still provide a summary
-    large_full = "line\n" * (settings.max_diff_lines + 1)
+    # Simulate a full diff over the limit: only the summary gets written
     small_summary = "# summary: huge diff, see details in PR\n"
-    mocker.patch(
-        "datamanager.core.generate_sql_diff",
-        return_value=(large_full, small_summary),
-    )
+
+    def fake_write_sql_diff(
+        old: Path, new: Path, out_path: Path, max_lines: int
+    ) -> bool:
+        assert max_lines == settings.max_diff_lines
+        out_path.write_text(small_summary)
+        return False
+
+    mocker.patch("datamanager.core.write_sql_diff", side_effect=fake_write_sql_diff)
 
     v3_file = test_repo / "v3_data.sqlite"
     v3_file.write_text("this is v3")
@@ -110,15 +121,122 @@ def test_prepare_for_update_with_large_diff(
     assert content == small_summary
 
 
+def test_prepare_for_update_with_prefetch(
+    test_repo: Path, mocker: MockerFixture
+) -> None:
+    """Test an update where the previous version is fetched while hashing."""
+    os.chdir(test_repo)
+    mocker.patch("datamanager.__main__.settings", replace(settings, prefetch_old=True))
+    mocker.patch("datamanager.core.get_r2_client")
+    mocker.patch("datamanager.core.upload_to_staging")
+    mock_download = mocker.patch("datamanager.core.download_from_r2")
+
+    def fake_write_sql_diff(
+        old: Path, new: Path, out_path: Path, max_lines: int
+    ) -> bool:
+        assert old == mock_download.call_args[0][2]
+        out_path.write_text("# summary\n")
+        return True
+
+    mocker.patch("datamanager.core.write_sql_diff", side_effect=fake_write_sql_diff)
+
+    v3_file = test_repo / "v3_data.sqlite"
+    v3_file.write_text("this is v3")
+
+    result = runner.invoke(app, ["prepare", "core-dataset.sqlite", str(v3_file)])
+    assert result.exit_code == 0, result.stdout
+    mock_download.assert_called_once()
+    assert "core-dataset/v2-" in mock_download.call_args[0][1]
+
+
+def _set_latest_size(size: int) -> None:
+    """Records `size` as the size of core-dataset.sqlite's latest version."""
+    data = json.loads(Path(settings.manifest_file).read_text())
+    data[0]["history"][0]["size_bytes"] = size
+    manifest.write_manifest(data)
+
+
+def test_prepare_size_change_prefetches(test_repo: Path, mocker: MockerFixture) -> None:
+    """Test that a size mismatch starts the old-version download before hashing."""
+    os.chdir(test_repo)
+    _set_latest_size(1)
+    mocker.patch("datamanager.core.get_r2_client")
+    mocker.patch("datamanager.core.upload_to_staging")
+    mock_download = mocker.patch("datamanager.core.download_from_r2")
+    mocker.patch("datamanager.core.write_sql_diff", return_value=True)
+    hash_file_cached = core.hash_file_cached
+
+    def checked_hash(path: Path) -> str:
+        mock_download.assert_called_once()  # already in flight
+        return hash_file_cached(path)
+
+    mocker.patch("datamanager.core.hash_file_cached", side_effect=checked_hash)
+
+    v3_file = test_repo / "v3_data.sqlite"
+    v3_file.write_text("this is v3")
+
+    result = runner.invoke(app, ["prepare", "core-dataset.sqlite", str(v3_file)])
+    assert result.exit_code == 0, result.stdout
+    mock_download.assert_called_once()
+
+    ds = manifest.get_dataset("core-dataset.sqlite")
+    assert ds is not None
+    assert ds["history"][0]["version"] == "v3"
+    assert ds["history"][0]["size_bytes"] == v3_file.stat().st_size
+
+
+def test_prepare_same_size_does_not_prefetch(
+    test_repo: Path, mocker: MockerFixture
+) -> None:
+    """Test that a matching size leaves the download until after hashing."""
+    os.chdir(test_repo)
+    v3_file = test_repo / "v3_data.sqlite"
+    v3_file.write_text("this is v3")
+    _set_latest_size(v3_file.stat().st_size)
+    mocker.patch("datamanager.core.get_r2_client")
+    mocker.patch("datamanager.core.upload_to_staging")
+    mock_download = mocker.patch("datamanager.core.download_from_r2")
+    mocker.patch("datamanager.core.write_sql_diff", return_value=True)
+    hash_file_cached = core.hash_file_cached
+
+    def checked_hash(path: Path) -> str:
+        mock_download.assert_not_called()
+        return hash_file_cached(path)
+
+    mocker.patch("datamanager.core.hash_file_cached", side_effect=checked_hash)
+
+    result = runner.invoke(app, ["prepare", "core-dataset.sqlite", str(v3_file)])
+    assert result.exit_code == 0, result.stdout
+    # The contents still differ, so the diff needs the download afterwards
+    mock_download.assert_called_once()
+
+
+def test_prepare_same_size_no_changes(test_repo: Path, mocker: MockerFixture) -> None:
+    """Test that an unchanged file of the recorded size downloads nothing."""
+    os.chdir(test_repo)
+    _set_latest_size((test_repo / "new_data.sqlite").stat().st_size)
+    mocker.patch("datamanager.core.get_r2_client")
+    mock_download = mocker.patch("datamanager.core.download_from_r2")
+
+    result = runner.invoke(app, ["prepare", "core-dataset.sqlite", "new_data.sqlite"])
+
+    assert result.exit_code == 0, result.stdout
+    assert "No changes detected" in result.stdout
+    mock_download.assert_not_called()
+
+
 def test_prepare_no_changes(test_repo: Path, mocker: MockerFixture) -> None:
     """Test 'prepare' when the file hash is identical to the latest version."""
     os.chdir(test_repo)
     mock_upload = mocker.patch("datamanager.core.upload_to_staging")
+    mock_progress = mocker.patch("rich.progress.Progress")
 
     result = runner.invoke(app, ["prepare", "core-dataset.sqlite", "new_data.sqlite"])
 
     assert result.exit_code == 0, result.stdout
     assert "No changes detected" in result.stdout
+    # Nothing is transferred, so no progress display is started
+    mock_progress.assert_not_called()
     mock_upload.assert_not_called()
 
 
@@ -278,7 +396,7 @@ def test_pull_interactive_success(test_repo: Path, mocker: MockerFixture) -> Non
         "questionary.select",
         side_effect=[
             mocker.Mock(ask=mocker.Mock(return_value="core-dataset.sqlite")),
-            mocker.Mock(ask=mocker.Mock(return_value="v1 (commit: f4b8e7a, ...)")),
+            mocker.Mock(ask=mocker.Mock(return_value="v1")),
         ],
     )
     mocker.patch(
@@ -342,6 +460,8 @@ def test_rollback_success(test_repo: Path, mocker: MockerFixture) -> None:
     assert new_v3_entry["r2_object_key"] == original_v1_entry["r2_object_key"]
     assert new_v3_entry["commit"] == "pending-merge"
     assert new_v3_entry["description"] == "Rollback to version v1"
+    # v1 predates size tracking, so the rollback must not invent a null size
+    assert "size_bytes" not in new_v3_entry
 
 
 def test_rollback_no_op(test_repo: Path, mocker: MockerFixture) -> None:
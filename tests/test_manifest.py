@@ -48,3 +48,17 @@ def test_update_latest_history_entry(test_repo: Path) -> None:
     assert data[0]["history"][0]["version"] == "v2"
     assert data[0]["history"][0]["commit"] == "abcdef"
     assert data[0]["latestVersion"] == "v2"
+
+
+def test_read_manifest_cache_invalidated_on_write(test_repo: Path) -> None:
+    """Test that cached reads are reused until the manifest is rewritten."""
+    os.chdir(test_repo)
+    first = manifest.read_manifest()
+    assert manifest.read_manifest() is first
+
+    manifest.update_latest_version("core-dataset.sqlite", "v9")
+
+    dataset = manifest.get_dataset("core-dataset.sqlite")
+    assert dataset is not None
+    assert dataset["latestVersion"] == "v9"
+    assert manifest.read_manifest() is not first
@@ -0,0 +1,100 @@
+# tests/test_publish_script.py
+import copy
+import importlib
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+from pytest_mock import MockerFixture
+
+
+@pytest.fixture
+def publish_script(ci_scripts: None) -> ModuleType:
+    """Imports the CI publish script."""
+    return importlib.import_module("publish_script")
+
+
+def test_finalize_dataset_docs_leaves_entries_untouched(
+    publish_script: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that rendering the docs table does not alter the manifest data."""
+    doc_path = tmp_path / "datasets.md"
+    monkeypatch.setattr(publish_script, "DATASETS_DOC_PATH", str(doc_path))
+    manifest_data: list[dict[str, Any]] = [
+        {
+            "fileName": "core.sqlite",
+            "history": [
+                {
+                    "version": "v1",
+                    "timestamp": "2025-06-30T10:00:00Z",
+                    "description": "first\nrelease",
+                    "r2_object_key": "core/v1.sqlite",
+                },
+                {"version": "v2", "description": "no timestamp"},
+            ],
+        }
+    ]
+    before = copy.deepcopy(manifest_data)
+
+    publish_script.finalize_dataset_docs(manifest_data)
+
+    assert manifest_data == before
+    rows = doc_path.read_text().splitlines()[-2:]
+    assert rows == [
+        "| core.sqlite | v1 | 2025-06-30T10:00:00 | first release | "
+        f"[Download]({publish_script.BASE_DOWNLOAD_URL}core/v1.sqlite) |",
+        "| core.sqlite | v2 | N/A | no timestamp | N/A |",
+    ]
+
+
+def test_handle_publications_settles_staging_delete_before_push(
+    publish_script: ModuleType,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    mocker: MockerFixture,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that a failed staging delete is reported, with its key, before pushing."""
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text("[]\n")
+    monkeypatch.setattr(publish_script, "MANIFEST_FILE", str(manifest_path))
+    monkeypatch.setattr(publish_script, "DATASETS_DOC_PATH", str(tmp_path / "d.md"))
+    mocker.patch.object(
+        publish_script,
+        "get_commit_details",
+        return_value={"hash": "abc1234", "subject": "Add core data"},
+    )
+    events: list[str] = []
+    client = mocker.patch.object(publish_script, "client", MagicMock())
+
+    def failing_delete(**kwargs: Any) -> None:
+        events.append("delete")
+        raise ClientError({"Error": {"Code": "InternalError"}}, "DeleteObject")
+
+    client.delete_object.side_effect = failing_delete
+    mocker.patch.object(
+        publish_script, "run_git", side_effect=lambda *args: events.append(args[-1])
+    )
+    manifest_data: list[dict[str, Any]] = [
+        {
+            "fileName": "core.sqlite",
+            "history": [
+                {
+                    "version": "v1",
+                    "timestamp": "2025-06-30T10:00:00Z",
+                    "r2_object_key": "core/v1.sqlite",
+                    "staging_key": "staging-uploads/abc.sqlite",
+                    "commit": "pending-merge",
+                    "description": "pending-merge",
+                }
+            ],
+        }
+    ]
+
+    assert publish_script.handle_publications(manifest_data) is True
+
+    assert events.index("delete") < events.index("push")
+    assert "staging-uploads/abc.sqlite" in capsys.readouterr().out
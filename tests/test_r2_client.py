@@ -0,0 +1,65 @@
+# tests/test_r2_client.py
+import importlib
+from types import ModuleType
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+
+@pytest.fixture
+def r2_client(ci_scripts: None) -> ModuleType:
+    """Imports the CI scripts' shared client module."""
+    return importlib.import_module("r2_client")
+
+
+def _error(key: str, code: str) -> dict[str, str]:
+    return {"Key": key, "Code": code, "Message": code}
+
+
+def test_delete_batch_retries_transient_errors(
+    r2_client: ModuleType, mocker: MockerFixture
+) -> None:
+    """Test that only the keys that failed transiently are sent again."""
+    client = mocker.patch.object(r2_client, "client", MagicMock())
+    client.delete_objects.side_effect = [
+        {"Errors": [_error("b", "SlowDown"), _error("c", "InternalError")]},
+        {"Errors": [_error("c", "ServiceUnavailable")]},
+        {},
+    ]
+    sleep = mocker.patch.object(r2_client.time, "sleep")
+
+    chunk = [{"Key": "a"}, {"Key": "b"}, {"Key": "c"}]
+    assert r2_client.delete_batch("bucket", chunk) == []
+
+    sent = [c.kwargs["Delete"]["Objects"] for c in client.delete_objects.call_args_list]
+    assert sent == [chunk, [{"Key": "b"}, {"Key": "c"}], [{"Key": "c"}]]
+    assert sleep.call_count == 2
+
+
+def test_delete_batch_returns_on_permanent_error(
+    r2_client: ModuleType, mocker: MockerFixture
+) -> None:
+    """Test that a non-transient error stops the retries straight away."""
+    errors = [_error("a", "SlowDown"), _error("b", "AccessDenied")]
+    client = mocker.patch.object(r2_client, "client", MagicMock())
+    client.delete_objects.return_value = {"Errors": errors}
+    sleep = mocker.patch.object(r2_client.time, "sleep")
+
+    assert r2_client.delete_batch("bucket", [{"Key": "a"}, {"Key": "b"}]) == errors
+    client.delete_objects.assert_called_once()
+    sleep.assert_not_called()
+
+
+def test_delete_batch_gives_up_after_max_attempts(
+    r2_client: ModuleType, mocker: MockerFixture
+) -> None:
+    """Test that persistent throttling is reported once attempts run out."""
+    errors = [_error("a", "SlowDown")]
+    client = mocker.patch.object(r2_client, "client", MagicMock())
+    client.delete_objects.return_value = {"Errors": errors}
+    sleep = mocker.patch.object(r2_client.time, "sleep")
+
+    assert r2_client.delete_batch("bucket", [{"Key": "a"}]) == errors
+    assert client.delete_objects.call_count == r2_client.MAX_DELETE_ATTEMPTS
+    assert sleep.call_count == r2_client.MAX_DELETE_ATTEMPTS - 1